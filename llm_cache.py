@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# In-memory entries beyond this are evicted least-recently-used; cached
+# responses older than the TTL are treated as misses in both tiers.
+MAX_ENTRIES = 512
+TTL_SECONDS = 3600
+
+_CACHE_DIR = Path(os.getenv("RUBRIC_VALIDATOR_CACHE_DIR", Path.home() / ".cache" / "rubric_validator"))
+_DB_PATH = _CACHE_DIR / "cache.sqlite"
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+
+def cache_key(messages: List[Dict[str, Any]], model: str) -> str:
+    """SHA-256 of the canonical message payload plus the model name."""
+    payload = json.dumps(messages, sort_keys=True).encode("utf-8") + model.encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(_DB_PATH))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "prompt_hash TEXT PRIMARY KEY, model_name TEXT, response_text TEXT, "
+            "created_at REAL, ttl REAL)"
+        )
+        return conn
+    except (OSError, sqlite3.Error):
+        # A read-only home or corrupt db should never break the actual LLM call.
+        return None
+
+
+def get(key: str) -> Optional[str]:
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            created_at, response = entry
+            if now - created_at < TTL_SECONDS:
+                _memory.move_to_end(key)
+                return response
+            del _memory[key]
+
+    conn = _connect()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT response_text, created_at, ttl FROM llm_cache WHERE prompt_hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        response, created_at, ttl = row
+        if now - created_at >= ttl:
+            conn.execute("DELETE FROM llm_cache WHERE prompt_hash = ?", (key,))
+            conn.commit()
+            return None
+        with _lock:
+            _memory[key] = (created_at, response)
+            _memory.move_to_end(key)
+            while len(_memory) > MAX_ENTRIES:
+                _memory.popitem(last=False)
+        return response
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def put(key: str, model: str, response: str) -> None:
+    now = time.time()
+    with _lock:
+        _memory[key] = (now, response)
+        _memory.move_to_end(key)
+        while len(_memory) > MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+    conn = _connect()
+    if conn is None:
+        return
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (prompt_hash, model_name, response_text, created_at, ttl) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, now, TTL_SECONDS),
+        )
+        conn.commit()
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
@@ -0,0 +1,104 @@
+import json
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+# LLMs occasionally emit almost-valid JSON (trailing commas, unquoted keys);
+# json_repair salvages those so the structured render path still runs.
+# Optional: without it, malformed output just falls back to the raw view.
+try:
+    import json_repair
+except ImportError:
+    json_repair = None
+
+
+class Rubric(BaseModel):
+    """A rubric draft; extra annotation fields are kept as-is."""
+
+    model_config = ConfigDict(extra="allow")
+
+    text: str
+
+
+class RubricFeedbackItem(BaseModel):
+    """One feedback entry from the LLM; extras (type, importance, ...) pass through."""
+
+    model_config = ConfigDict(extra="allow")
+
+    id: str = ""
+    verdict: Literal["pass", "fail", "ok", "incorrect"]
+    flags: Optional[Dict[str, bool]] = None
+    issues: List[str] = []
+    suggested_fix: str = ""
+
+
+class RubricFeedback(BaseModel):
+    rubric_feedback: List[RubricFeedbackItem]
+
+
+RUBRIC_LIST = TypeAdapter(List[Rubric])
+
+
+def parse_rubric_feedback(content: str) -> Optional[List[dict]]:
+    """Parse and validate an LLM response in one pass through pydantic's Rust core.
+
+    Returns plain dicts for the renderer, or None when the payload does not
+    match the expected shape.
+    """
+    try:
+        report = RubricFeedback.model_validate_json(content)
+    except ValidationError:
+        if json_repair is None:
+            return None
+        try:
+            report = RubricFeedback.model_validate(json_repair.loads(content))
+        except (ValueError, ValidationError):
+            return None
+    return [item.model_dump() for item in report.rubric_feedback]
+
+
+# msgspec decodes straight into typed structs in C — markedly faster than
+# json.loads + pydantic for batch workloads that parse thousands of responses.
+# Optional: without it, decode_rubric_feedback falls back to the pydantic path.
+try:
+    import msgspec
+
+    class _FeedbackItemStruct(msgspec.Struct):
+        id: str = ""
+        verdict: str = ""
+        flags: Optional[Dict[str, bool]] = None
+        issues: List[str] = msgspec.field(default_factory=list)
+        suggested_fix: str = ""
+
+    class _FeedbackStruct(msgspec.Struct):
+        rubric_feedback: List[_FeedbackItemStruct]
+
+    _FEEDBACK_DECODER = msgspec.json.Decoder(_FeedbackStruct)
+except ImportError:
+    msgspec = None
+    _FEEDBACK_DECODER = None
+
+
+def decode_rubric_feedback(content: str) -> Optional[List[dict]]:
+    """Single C-level typed decode of an LLM response, for batch/CLI hot paths.
+
+    Falls back to parse_rubric_feedback (pydantic + repair) when msgspec is
+    missing or the payload does not decode cleanly.
+    """
+    if _FEEDBACK_DECODER is not None:
+        try:
+            report = _FEEDBACK_DECODER.decode(content)
+        except (msgspec.DecodeError, msgspec.ValidationError):
+            return parse_rubric_feedback(content)
+        return [msgspec.structs.asdict(item) for item in report.rubric_feedback]
+    return parse_rubric_feedback(content)
+
+
+def loads_lenient(content: str):
+    """json.loads with a json_repair fallback for slightly malformed output."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        if json_repair is None:
+            raise
+        return json_repair.loads(content)
@@ -1,5 +1,31 @@
 import json
-from typing import Dict, List
+from typing import Any, Dict, List
+
+# Strict schema for the rating-audit output; mirrors the JSON shape in the
+# system prompt below and can drive provider-side constrained decoding.
+RATING_FEEDBACK_SCHEMA: Dict[str, Any] = {
+    "title": "rating_feedback",
+    "type": "object",
+    "properties": {
+        "rating_feedback": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "response_id": {"type": "string"},
+                    "rubric_id": {"type": "string"},
+                    "verdict": {"type": "string", "enum": ["ok", "incorrect"]},
+                    "issues": {"type": "array", "items": {"type": "string"}},
+                    "suggested_fix": {"type": "string"},
+                },
+                "required": ["response_id", "rubric_id", "verdict", "issues", "suggested_fix"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["rating_feedback"],
+    "additionalProperties": False,
+}
 
 
 def build_ratings_messages(summary: str, pr_diff: str, ratings: Dict, rubric_lookup: Dict[str, Dict]) -> List[Dict[str, str]]:
@@ -34,7 +60,11 @@ Return JSON:
   ]
 }
 """
-    user_content = f"PR diff/summary:\n{pr_diff}\n\nResponse summary:\n{summary}\n\nRubric ratings JSON:\n{json.dumps(ratings, indent=2)}\n\nRubric definitions (by id):\n{json.dumps(rubric_lookup, indent=2)}"
+    # Compact separators: indent whitespace only inflates the prompt token
+    # count, the model reads minified JSON just as well.
+    ratings_json = json.dumps(ratings, separators=(",", ":"))
+    rubric_lookup_json = json.dumps(rubric_lookup, separators=(",", ":"))
+    user_content = f"PR diff/summary:\n{pr_diff}\n\nResponse summary:\n{summary}\n\nRubric ratings JSON:\n{ratings_json}\n\nRubric definitions (by id):\n{rubric_lookup_json}"
     return [
         {"role": "system", "content": system_prompt.strip()},
         {"role": "user", "content": user_content},
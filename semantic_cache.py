@@ -0,0 +1,133 @@
+import difflib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Optional dependencies: the semantic cache silently disables itself when
+# sentence-transformers or faiss are not installed, so the core validator
+# keeps working with only the exact-hash cache from llm_cache.
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_DIM = 384
+SIMILARITY_THRESHOLD = 0.97
+# Embedding similarity alone is not enough: MiniLM truncates input at 256
+# word-piece tokens, and our queries share a long invariant prefix (the repo
+# description), so unrelated diffs can embed near-identically. A hit must also
+# pass a character-level comparison against the stored query text.
+TEXT_SIMILARITY_THRESHOLD = 0.95
+MAX_LENGTH_DELTA = 0.05
+
+_CACHE_DIR = Path(os.getenv("RUBRIC_VALIDATOR_CACHE_DIR", Path.home() / ".cache" / "rubric_validator"))
+_INDEX_PATH = _CACHE_DIR / "semantic.index"
+_META_PATH = _CACHE_DIR / "semantic_meta.json"
+
+_lock = threading.Lock()
+_model = None
+_model_failed = False
+_index = None
+_responses: list[dict] = []
+
+
+def available() -> bool:
+    return faiss is not None and not _model_failed
+
+
+def _load() -> bool:
+    global _model, _model_failed, _index, _responses
+    if _model is not None:
+        return True
+    try:
+        _model = SentenceTransformer(EMBED_MODEL)
+    except Exception:
+        # No network and no local model cache, typically. Degrade to
+        # unavailable instead of breaking the LLM call path.
+        _model_failed = True
+        return False
+    if _INDEX_PATH.exists() and _META_PATH.exists():
+        try:
+            _index = faiss.read_index(str(_INDEX_PATH))
+            with open(_META_PATH, "r", encoding="utf-8") as f:
+                _responses = json.load(f)
+        except (OSError, RuntimeError, ValueError):
+            _index = None
+    if _index is None or _index.ntotal != len(_responses):
+        _index = faiss.IndexFlatIP(EMBED_DIM)
+        _responses = []
+    return True
+
+
+def _texts_match(stored: str, text: str) -> bool:
+    if not stored:
+        return False
+    longest = max(len(stored), len(text))
+    if longest and abs(len(stored) - len(text)) / longest > MAX_LENGTH_DELTA:
+        return False
+    matcher = difflib.SequenceMatcher(None, stored, text, autojunk=False)
+    # quick_ratio is a cheap upper bound; only run the full comparison when it
+    # could plausibly clear the threshold.
+    if matcher.quick_ratio() < TEXT_SIMILARITY_THRESHOLD:
+        return False
+    return matcher.ratio() >= TEXT_SIMILARITY_THRESHOLD
+
+
+def _persist() -> None:
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(_index, str(_INDEX_PATH))
+        with open(_META_PATH, "w", encoding="utf-8") as f:
+            json.dump(_responses, f)
+    except OSError:
+        pass
+
+
+def _embed(texts: list) -> "np.ndarray":
+    # One encode call amortizes tokenization and model forward-pass overhead
+    # across all inputs instead of paying it per text.
+    vecs = _model.encode(texts, normalize_embeddings=True)
+    return np.asarray(vecs, dtype=np.float32)
+
+
+def get(text: str, model_name: str) -> Optional[str]:
+    """Return a cached response whose query is near-identical to `text`."""
+    if not available():
+        return None
+    with _lock:
+        if not _load() or _index.ntotal == 0:
+            return None
+        scores, ids = _index.search(_embed([text]), 1)
+        score, idx = float(scores[0][0]), int(ids[0][0])
+        if idx < 0 or score < SIMILARITY_THRESHOLD:
+            return None
+        entry = _responses[idx]
+        if entry.get("model") != model_name:
+            return None
+        if not _texts_match(entry.get("text", ""), text):
+            return None
+        return entry.get("response")
+
+
+def put(text: str, model_name: str, response: str) -> None:
+    put_many([text], model_name, [response])
+
+
+def put_many(texts: list, model_name: str, responses: list) -> None:
+    """Embed all texts in one batch and add them to the index in one call."""
+    if not available() or not texts:
+        return
+    with _lock:
+        if not _load():
+            return
+        _index.add(_embed(texts))
+        _responses.extend(
+            {"model": model_name, "response": response, "text": text}
+            for text, response in zip(texts, responses)
+        )
+        _persist()
@@ -1,30 +1,40 @@
 import json
 import os
 from pathlib import Path
+import pandas as pd
 import streamlit as st
 from streamlit.runtime.secrets import StreamlitSecretNotFoundError
 from dotenv import load_dotenv
-from rubric_validator import build_messages, call_llm
-from ratings_validator import build_ratings_messages
+from models import loads_lenient, parse_rubric_feedback
+from rubric_validator import (
+    RUBRIC_FEEDBACK_SCHEMA,
+    build_messages,
+    build_messages_per_rubric,
+    call_llm,
+    call_llm_batch,
+    call_llm_stream,
+)
+from ratings_validator import RATING_FEEDBACK_SCHEMA, build_ratings_messages
 
 st.set_page_config(page_title="Rubric Validator", layout="wide")
 
 # Load secrets (Streamlit Cloud) and local .env fallback.
-secrets_dict: dict[str, str] = {}
-try:
+@st.cache_resource
+def _load_secrets() -> dict[str, str]:
+    # st.secrets access parses the TOML file; cache_resource keeps that to a
+    # single read per session instead of once per script rerun.
+    loaded: dict[str, str] = {}
     for key in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "ENABLE_DRY_RUN"):
-        if key in st.secrets:
-            val = st.secrets[key]
-            if val is not None:
-                secrets_dict[key] = str(val)
-        elif os.environ.get(key) is not None:
-            if key in os.environ:
-                val = os.environ[key]
-                if val is not None:
-                 secrets_dict[key] = os.environ[key]
-except:
-    StreamlitSecretNotFoundError(f"Secret {key} not found in Streamlit secrets or environment.")
+        try:
+            val = st.secrets[key] if key in st.secrets else os.environ.get(key)
+        except StreamlitSecretNotFoundError:
+            val = os.environ.get(key)
+        if val is not None:
+            loaded[key] = str(val)
+    return loaded
 
+
+secrets_dict = _load_secrets()
 if secrets_dict:
     os.environ.update(secrets_dict)
 BASE_DIR = Path(__file__).resolve().parent
@@ -68,55 +78,45 @@ repo_description = st.text_area("Repository Description", height=120, key="repo_
 pr_diff = st.text_area("PR Diff / Summary", height=200, key="pr_diff")
 
 st.markdown("### Rubrics")
-st.write("Add as many as you need. Each rubric has an ID, type, importance, positive flag, and text.")
-
-# Render dynamic rubric inputs
-for idx, rubric in enumerate(list(st.session_state["rubrics"])):
-    with st.expander(f"Rubric {idx + 1}: {rubric.get('id', f'R{idx+1}')}", expanded=True):
-        new_id = st.text_input("ID", value=rubric.get("id", f"R{idx+1}"), key=f"id_{idx}")
-        type_options = ["correctness", "code style", "summary", "agent behavior", "other"]
-        current_type = rubric.get("type", "correctness")
-        type_index = type_options.index(current_type) if current_type in type_options else 0
-        new_type = st.selectbox("Type", type_options, index=type_index, key=f"type_{idx}")
-
-        importance_options = ["must-follow", "good-to-have", "universal"]
-        current_importance = rubric.get("importance", "must-follow")
-        importance_index = importance_options.index(current_importance) if current_importance in importance_options else 0
-        new_importance = st.radio(
-            "Importance",
-            options=importance_options,
-            index=importance_index,
-            key=f"importance_{idx}",
-            format_func=lambda x: {"must-follow": "Must Follow", "good-to-have": "Good to have", "universal": "Universal"}.get(x, x),
-        )
-
-        current_positive = bool(rubric.get("positive", True))
-        new_positive = st.radio(
-            "Is the criterion positive?",
-            options=[True, False],
-            index=0 if current_positive else 1,
-            key=f"positive_{idx}",
-            format_func=lambda x: "True" if x else "False",
-        )
-
-        new_text = st.text_area("Text", value=rubric.get("text", ""), height=120, key=f"text_{idx}")
-        st.session_state["rubrics"][idx] = {
-            "id": new_id,
-            "type": new_type,
-            "importance": new_importance,
-            "positive": new_positive,
-            "text": new_text,
-        }
-        if st.button("Remove this rubric", key=f"remove_{idx}"):
-            st.session_state["rubrics"].pop(idx)
-            st.rerun()
-
-if st.button("Add rubric"):
-    new_idx = len(st.session_state["rubrics"]) + 1
-    st.session_state["rubrics"].append(
-        {"id": f"R{new_idx}", "type": "correctness", "importance": "must-follow", "positive": True, "text": ""}
-    )
-    st.rerun()
+st.write("Edit rubrics in the grid; add or delete rows as needed. Each rubric has an ID, type, importance, positive flag, and text.")
+
+TYPE_OPTIONS = ["correctness", "code style", "summary", "agent behavior", "other"]
+IMPORTANCE_OPTIONS = ["must-follow", "good-to-have", "universal"]
+
+
+def _cell(row: dict, key: str, default):
+    val = row.get(key)
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return default
+    return val
+
+
+# One editable grid instead of ~6 widgets per rubric: a single message to the
+# browser regardless of rubric count.
+rubrics_df = pd.DataFrame(st.session_state["rubrics"], columns=["id", "type", "importance", "positive", "text"])
+edited_df = st.data_editor(
+    rubrics_df,
+    num_rows="dynamic",
+    use_container_width=True,
+    column_config={
+        "id": st.column_config.TextColumn("ID"),
+        "type": st.column_config.SelectboxColumn("Type", options=TYPE_OPTIONS, default="correctness"),
+        "importance": st.column_config.SelectboxColumn("Importance", options=IMPORTANCE_OPTIONS, default="must-follow"),
+        "positive": st.column_config.CheckboxColumn("Positive", default=True),
+        "text": st.column_config.TextColumn("Text", width="large"),
+    },
+    key="rubrics_editor",
+)
+st.session_state["rubrics"] = [
+    {
+        "id": str(_cell(row, "id", f"R{idx + 1}")),
+        "type": _cell(row, "type", "correctness"),
+        "importance": _cell(row, "importance", "must-follow"),
+        "positive": bool(_cell(row, "positive", True)),
+        "text": str(_cell(row, "text", "")),
+    }
+    for idx, row in enumerate(edited_df.to_dict("records"))
+]
 
 # Bulk load rubrics from pasted JSON (id/title/annotations format)
 st.markdown("### Load rubrics from JSON")
@@ -167,11 +167,18 @@ if st.button("Replace rubrics with pasted JSON"):
             raise ValueError("No valid rubric objects found.")
 
         st.session_state["rubrics"] = mapped
+        # Drop the editor's widget state so the grid picks up the new rows.
+        st.session_state.pop("rubrics_editor", None)
         st.success(f"Loaded {len(mapped)} rubrics from JSON.")
         st.rerun()
     except Exception as exc:
         st.error(f"Failed to parse JSON: {exc}")
 
+stream_mode = st.toggle(
+    "Stream response",
+    value=False,
+    help="Send one combined prompt and render tokens as they arrive instead of dispatching per-rubric calls.",
+)
 run = st.button("Validate")
 
 # Optional: enable dry-run only if admin flag is set in secrets (ENABLE_DRY_RUN=true)
@@ -213,13 +220,26 @@ ratings_output = st.empty()
 ratings_status = st.empty()
 
 
-def handle(dry: bool):
+@st.cache_data(max_entries=32)
+def _cached_build_messages(repo_description: str, pr_diff: str, rubrics_json: str) -> list:
+    # Rubrics arrive as a canonical JSON string so the cache key is hashable
+    # and stable; repeated reruns with unchanged inputs skip the rebuild.
+    return build_messages(repo_description, pr_diff, json.loads(rubrics_json))
+
+
+@st.cache_data(max_entries=32)
+def _rubric_lookup(rubrics_json: str) -> dict:
+    return {r["id"]: r for r in json.loads(rubrics_json) if isinstance(r, dict) and r.get("id")}
+
+
+def handle(dry: bool, stream: bool = False):
     rubrics = st.session_state.get("rubrics", [])
-    rubric_lookup = {r.get("id"): r for r in rubrics if isinstance(r, dict) and r.get("id")}
-    messages = build_messages(
+    rubrics_json = json.dumps(rubrics, sort_keys=True)
+    rubric_lookup = _rubric_lookup(rubrics_json)
+    messages = _cached_build_messages(
         st.session_state.get("repo_description", ""),
         st.session_state.get("pr_diff", ""),
-        rubrics,
+        rubrics_json,
     )
 
     if dry:
@@ -229,47 +249,116 @@ def handle(dry: bool):
 
     status_placeholder.info("Calling LLM...")
     try:
-        content = call_llm(
-            messages,
-            st.session_state.get("model", MODEL_DEFAULT),
-            False,
-            os.getenv("OPENAI_API_KEY"),
-            os.getenv("OPENAI_BASE_URL"),
-        )
-        try:
-            parsed = json.loads(content)
-        except json.JSONDecodeError:
-            parsed = {"raw": content}
-
-        # Render structured output if rubric_feedback exists
-        feedback = parsed.get("rubric_feedback") if isinstance(parsed, dict) else None
-        if feedback and isinstance(feedback, list):
+        model = st.session_state.get("model", MODEL_DEFAULT)
+        feedback = None
+        parsed = None
+        if stream:
+            # Render tokens as they arrive; perceived latency drops to the
+            # provider's first-token time instead of the full decode.
+            streamed = st.write_stream(
+                call_llm_stream(
+                    messages,
+                    model,
+                    os.getenv("OPENAI_API_KEY"),
+                    os.getenv("OPENAI_BASE_URL"),
+                    response_schema=RUBRIC_FEEDBACK_SCHEMA,
+                )
+            )
+            content = streamed if isinstance(streamed, str) else "".join(streamed)
+            feedback = parse_rubric_feedback(content)
+            if feedback is None:
+                try:
+                    parsed = loads_lenient(content)
+                except ValueError:
+                    parsed = {"raw": content}
+        elif rubrics:
+            # One call per rubric, dispatched concurrently: N rubrics finish in
+            # roughly the wall-clock of the slowest single-rubric decode.
+            per_rubric_messages = [
+                build_messages_per_rubric(
+                    st.session_state.get("repo_description", ""),
+                    st.session_state.get("pr_diff", ""),
+                    rubric,
+                )
+                for rubric in rubrics
+            ]
+            contents = call_llm_batch(
+                per_rubric_messages,
+                model,
+                os.getenv("OPENAI_API_KEY"),
+                os.getenv("OPENAI_BASE_URL"),
+                return_exceptions=True,
+                response_schema=RUBRIC_FEEDBACK_SCHEMA,
+            )
+            merged: list = []
+            raw_chunks: list[tuple[str, str]] = []
+            for rubric, content in zip(rubrics, contents):
+                rubric_id = rubric.get("id", "") if isinstance(rubric, dict) else ""
+                if isinstance(content, BaseException):
+                    # One failed call (rate limit, timeout) gets its own error
+                    # row instead of sinking the other N-1 results.
+                    merged.append(
+                        {"id": rubric_id, "verdict": "error", "issues": [str(content)], "suggested_fix": ""}
+                    )
+                    continue
+                items = parse_rubric_feedback(content)
+                if items is not None:
+                    merged.extend(items)
+                else:
+                    raw_chunks.append((rubric_id, content))
+            if raw_chunks:
+                st.warning(f"{len(raw_chunks)} rubric response(s) could not be parsed.")
+                with st.expander("Unparsed responses"):
+                    for rubric_id, chunk in raw_chunks:
+                        st.markdown(f"**{rubric_id or 'unlabeled'}**")
+                        st.code(chunk)
+            if merged:
+                feedback = merged
+            else:
+                parsed = {"raw": "\n".join(chunk for _, chunk in raw_chunks)}
+        else:
+            content = call_llm(
+                messages,
+                model,
+                False,
+                os.getenv("OPENAI_API_KEY"),
+                os.getenv("OPENAI_BASE_URL"),
+                response_schema=RUBRIC_FEEDBACK_SCHEMA,
+            )
+            feedback = parse_rubric_feedback(content)
+            if feedback is None:
+                try:
+                    parsed = loads_lenient(content)
+                except ValueError:
+                    parsed = {"raw": content}
+
+        # Render structured output if the response matched the feedback models
+        if feedback:
+            # One dataframe widget instead of ~8 widgets per rubric: a single
+            # payload over the WebSocket regardless of rubric count.
+            rows = []
             for idx, item in enumerate(feedback):
-                rubric_id = item.get("id", "") if isinstance(item, dict) else ""
+                rubric_id = item.get("id", "")
                 original = rubric_lookup.get(rubric_id) or (rubrics[idx] if idx < len(rubrics) else {})
-                item_type = item.get("type") if isinstance(item, dict) else None
-                item_importance = item.get("importance") if isinstance(item, dict) else None
-                item_positive = item.get("positive") if isinstance(item, dict) else None
-                item_text = item.get("text") if isinstance(item, dict) else None
-
-                st.subheader(f"Rubric {idx + 1}: {rubric_id}")
-                st.write(f"Type: {item_type or original.get('type', 'n/a')}")
-                st.write(f"Importance: {item_importance or original.get('importance', 'n/a')}")
-                st.write(f"Positive: {item_positive if item_positive is not None else original.get('positive', 'n/a')}")
-                st.write(f"Text: {item_text or original.get('text', 'n/a')}")
-                if isinstance(item, dict):
-                    verdict = item.get("verdict", "")
-                    verdict_color = "green" if str(verdict).lower() == "pass" else "red"
-                    st.markdown(f"**Verdict:** <span style='color:{verdict_color}'>{verdict}</span>", unsafe_allow_html=True)
-                    issues = item.get("issues", [])
-                    suggested = item.get("suggested_fix", "")
-                    if issues:
-                        st.markdown("**Issues:**")
-                        for issue in issues:
-                            st.write(f"- {issue}")
-                    if suggested:
-                        st.markdown("**Suggested fix:**")
-                        st.write(suggested)
+                positive = item.get("positive")
+                rows.append(
+                    {
+                        "id": rubric_id,
+                        "type": item.get("type") or original.get("type", "n/a"),
+                        "importance": item.get("importance") or original.get("importance", "n/a"),
+                        "positive": positive if positive is not None else original.get("positive", "n/a"),
+                        "text": item.get("text") or original.get("text", "n/a"),
+                        "verdict": item.get("verdict", ""),
+                        "issues": "; ".join(item.get("issues", []) or []),
+                        "suggested_fix": item.get("suggested_fix", ""),
+                    }
+                )
+            df = pd.DataFrame(rows)
+            styled = df.style.apply(
+                lambda row: ["background-color:#fdd" if row["verdict"] in ("fail", "error") else "" for _ in row],
+                axis=1,
+            )
+            result_placeholder.dataframe(styled, use_container_width=True)
         else:
             result_placeholder.json(parsed)
 
@@ -279,7 +368,7 @@ def handle(dry: bool):
 
 
 if run:
-    handle(False)
+    handle(False, stream=stream_mode)
 elif dry_run:
     handle(True)
 
@@ -294,7 +383,7 @@ if st.button("Validate ratings"):
     else:
         ratings_status.info("Calling LLM for ratings validation...")
         try:
-            rubric_lookup = {r.get("id"): r for r in st.session_state.get("rubrics", []) if isinstance(r, dict) and r.get("id")}
+            rubric_lookup = _rubric_lookup(json.dumps(st.session_state.get("rubrics", []), sort_keys=True))
             messages = build_ratings_messages(ratings_summary, ratings_pr_diff, ratings, rubric_lookup)
             content = call_llm(
                 messages,
@@ -302,10 +391,11 @@ if st.button("Validate ratings"):
                 False,
                 os.getenv("OPENAI_API_KEY"),
                 os.getenv("OPENAI_BASE_URL"),
+                response_schema=RATING_FEEDBACK_SCHEMA,
             )
             try:
-                parsed = json.loads(content)
-            except json.JSONDecodeError:
+                parsed = loads_lenient(content)
+            except ValueError:
                 parsed = {"raw": content}
 
             feedback = parsed.get("rating_feedback") if isinstance(parsed, dict) else None